@@ -1,30 +1,222 @@
 import json
+import gzip
+import mmap
+import os
+import sys
 import time
 import threading
 import argparse
-from datetime import datetime
+from collections import Counter
+from operator import itemgetter
 try:
-    import pynput
     from pynput import mouse, keyboard
-    from pynput.mouse import Button, Listener as MouseListener
-    from pynput.keyboard import Key, Listener as KeyboardListener
+    from pynput.mouse import Button
+    from pynput.keyboard import Key
 except ImportError:
     print("Please install pynput: pip install pynput")
     exit(1)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Hand the last stretch before each deadline to a busy-wait, since OS sleeps
+# can overshoot by a full scheduler tick (~15.6 ms on Windows).
+SPIN_MARGIN = 0.0015
+
+# Longest single blocking wait. Event.wait cannot be interrupted on Windows,
+# so long gaps are waited out in slices to let Ctrl+C through.
+WAIT_SLICE = 0.2
+
+# Recordings above this size are stream-parsed (with ijson) rather than read whole
+STREAM_THRESHOLD = 64 * 1024 * 1024
+
+# Map key names from recordings to pynput keys. record.py writes special
+# keys by their Key member name (ctrl_l, shift_r, caps_lock, ...), and
+# __members__ also covers names that alias another key on this platform.
+# 'escape' is kept for older recordings.
+_KEY_MAP = dict(Key.__members__)
+_KEY_MAP['escape'] = Key.esc
+
+# Map mouse button names from recordings to pynput buttons
+_BUTTON_MAP = {
+    'left': Button.left,
+    'right': Button.right,
+    'middle': Button.middle,
+}
+
+def boost_thread_priority():
+    """Raise the calling thread's scheduling priority and pin it to one CPU
+    
+    Returns a callable that restores the previous settings.
+    """
+    undo = []
+    
+    if sys.platform == 'win32':
+        try:
+            import ctypes
+            from ctypes import wintypes
+            # A private instance, so these declarations don't leak into ctypes.windll
+            kernel32 = ctypes.WinDLL('kernel32')
+            DWORD_PTR = ctypes.c_size_t  # affinity masks are pointer-sized
+            kernel32.GetCurrentThread.restype = wintypes.HANDLE
+            kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+            kernel32.GetThreadPriority.argtypes = [wintypes.HANDLE]
+            kernel32.GetThreadPriority.restype = ctypes.c_int
+            kernel32.SetThreadPriority.argtypes = [wintypes.HANDLE, ctypes.c_int]
+            kernel32.SetThreadPriority.restype = wintypes.BOOL
+            kernel32.GetProcessAffinityMask.argtypes = [wintypes.HANDLE, ctypes.POINTER(DWORD_PTR),
+                                                        ctypes.POINTER(DWORD_PTR)]
+            kernel32.GetProcessAffinityMask.restype = wintypes.BOOL
+            kernel32.SetThreadAffinityMask.argtypes = [wintypes.HANDLE, DWORD_PTR]
+            kernel32.SetThreadAffinityMask.restype = DWORD_PTR
+            
+            thread = kernel32.GetCurrentThread()
+            previous_priority = kernel32.GetThreadPriority(thread)
+            if kernel32.SetThreadPriority(thread, 15):  # THREAD_PRIORITY_TIME_CRITICAL
+                undo.append(lambda: kernel32.SetThreadPriority(thread, previous_priority))
+            process_mask = DWORD_PTR()
+            system_mask = DWORD_PTR()
+            if (kernel32.GetProcessAffinityMask(kernel32.GetCurrentProcess(), ctypes.byref(process_mask),
+                                                ctypes.byref(system_mask)) and process_mask.value):
+                # Like on Linux, take the highest allowed CPU to stay off CPU 0
+                highest_cpu = 1 << (process_mask.value.bit_length() - 1)
+                previous_mask = kernel32.SetThreadAffinityMask(thread, highest_cpu)
+                if previous_mask:
+                    undo.append(lambda: kernel32.SetThreadAffinityMask(thread, previous_mask))
+        except Exception as e:
+            print(f"Could not raise replay thread priority: {e}")
+    else:
+        # On Linux, pid 0 refers to the calling thread only
+        try:
+            previous_policy = os.sched_getscheduler(0)
+            previous_param = os.sched_getparam(0)
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(20))
+            undo.append(lambda: os.sched_setscheduler(0, previous_policy, previous_param))
+        except (AttributeError, OSError) as e:
+            print(f"Could not raise replay thread priority: {e}")
+        try:
+            previous_cpus = os.sched_getaffinity(0)
+            # Stay off CPU 0, which usually services most interrupts
+            os.sched_setaffinity(0, {max(previous_cpus)})
+            undo.append(lambda: os.sched_setaffinity(0, previous_cpus))
+        except (AttributeError, OSError) as e:
+            print(f"Could not pin replay thread to a CPU: {e}")
+    
+    def restore():
+        for step in reversed(undo):
+            try:
+                step()
+            except Exception:
+                pass
+    return restore
+
+def native_position_setter():
+    """Return a function that moves the pointer through the OS directly, or None
+    
+    Mouse moves make up most of a typical recording. pynput sends them through
+    python-xlib on X11 and adds listener bookkeeping on Windows, so they are
+    issued straight to SetCursorPos / XTestFakeMotionEvent when available.
+    """
+    try:
+        import ctypes
+        if sys.platform == 'win32':
+            set_cursor_pos = ctypes.windll.user32.SetCursorPos
+            
+            def set_position(position):
+                set_cursor_pos(int(position[0]), int(position[1]))
+            return set_position
+        
+        if sys.platform.startswith('linux') and os.environ.get('DISPLAY'):
+            import ctypes.util
+            xlib_path = ctypes.util.find_library('X11')
+            xtst_path = ctypes.util.find_library('Xtst')
+            if not (xlib_path and xtst_path):
+                return None
+            xlib = ctypes.cdll.LoadLibrary(xlib_path)
+            xtst = ctypes.cdll.LoadLibrary(xtst_path)
+            xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+            xlib.XOpenDisplay.restype = ctypes.c_void_p
+            xlib.XFlush.argtypes = [ctypes.c_void_p]
+            xtst.XTestFakeMotionEvent.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int,
+                                                  ctypes.c_int, ctypes.c_ulong]
+            display = xlib.XOpenDisplay(None)
+            if not display:
+                return None
+            fake_motion = xtst.XTestFakeMotionEvent
+            flush = xlib.XFlush
+            
+            def set_position(position):
+                fake_motion(display, -1, int(position[0]), int(position[1]), 0)
+                flush(display)
+            return set_position
+    except Exception:
+        pass
+    return None
+
+def expand_key_strokes(actions):
+    """Split key_stroke actions into key_press/key_release pairs, in timestamp order"""
+    expanded = []
+    for action in actions:
+        if action['type'] != 'key_stroke':
+            expanded.append(action)
+            continue
+        press = {'type': 'key_press', 'timestamp': action['timestamp'],
+                 'key': action['key'], 'modifiers': action.get('modifiers', [])}
+        release = dict(press, type='key_release',
+                       timestamp=action['timestamp'] + action['duration'])
+        expanded.append(press)
+        expanded.append(release)
+    # A stroke is written when the key is released, after any mouse actions
+    # that happened while it was held
+    expanded.sort(key=itemgetter('timestamp'))
+    return expanded
 
 class ActionReplayer:
-    def __init__(self):
+    def __init__(self, fast_mouse=True):
         self.mouse_controller = mouse.Controller()
         self.keyboard_controller = keyboard.Controller()
+        self.native_set_position = native_position_setter() if fast_mouse else None
+        self._set_position = self._position_setter()
         self.is_replaying = False
         self.replay_thread = None
+        self._stop = threading.Event()
         self.start_time = None
+        self.recording_info = {}
+        self.action_count = 0
+        self._unknown_keys = set()
         
     def load_recording(self, json_file_path):
         """Load the recording from JSON file"""
         try:
-            with open(json_file_path, 'r') as file:
-                data = json.load(file)
+            if str(json_file_path).endswith('.gz'):
+                # Compressed recordings (record.py --compress) are decompressed in memory
+                with gzip.open(json_file_path, 'rb') as file:
+                    raw = file.read()
+                data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+            else:
+                with open(json_file_path, 'rb') as file:
+                    if ijson is not None and os.fstat(file.fileno()).st_size > STREAM_THRESHOLD:
+                        # Parse straight from the file so the raw text never has to be
+                        # held in memory next to the decoded actions
+                        data = dict(ijson.kvitems(file, '', use_float=True))
+                    elif orjson is not None:
+                        # orjson parses straight from the mapped pages, which skips
+                        # copying the whole file into a bytes object first
+                        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                            view = memoryview(mapped)
+                            try:
+                                data = orjson.loads(view)
+                            finally:
+                                view.release()
+                    else:
+                        data = json.loads(file.read())
+            self.recording_info = data.get('recording_info', {})
+            self.action_count = len(data.get('actions', []))
             return data
         except Exception as e:
             print(f"Error loading file: {e}")
@@ -32,75 +224,121 @@ class ActionReplayer:
     
     def map_key(self, key_name):
         """Map key names from recording to pynput keys"""
-        key_mapping = {
-            # Special keys
-            'media_play_pause': Key.media_play_pause,
-            'alt': Key.alt,
-            'ctrl': Key.ctrl,
-            'shift': Key.shift,
-            'enter': Key.enter,
-            'space': Key.space,
-            'tab': Key.tab,
-            'backspace': Key.backspace,
-            'delete': Key.delete,
-            'escape': Key.esc,
-            'up': Key.up,
-            'down': Key.down,
-            'left': Key.left,
-            'right': Key.right,
-            'home': Key.home,
-            'end': Key.end,
-            'page_up': Key.page_up,
-            'page_down': Key.page_down,
-            'f1': Key.f1, 'f2': Key.f2, 'f3': Key.f3, 'f4': Key.f4,
-            'f5': Key.f5, 'f6': Key.f6, 'f7': Key.f7, 'f8': Key.f8,
-            'f9': Key.f9, 'f10': Key.f10, 'f11': Key.f11, 'f12': Key.f12,
-        }
-        
-        # Return mapped key or the original key for regular characters
-        return key_mapping.get(key_name, key_name)
+        # Return mapped key, the character itself for regular keys, or None
+        # for names pynput cannot type
+        key = _KEY_MAP.get(key_name)
+        if key is None and len(key_name) == 1:
+            key = key_name
+        return key
     
     def map_mouse_button(self, button_name):
         """Map mouse button names to pynput buttons"""
-        button_mapping = {
-            'left': Button.left,
-            'right': Button.right,
-            'middle': Button.middle,
-        }
-        return button_mapping.get(button_name, Button.left)
+        return _BUTTON_MAP.get(button_name, Button.left)
+    
+    def _position_setter(self):
+        """Return a callable that moves the pointer, bypassing pynput when possible"""
+        if self.native_set_position is not None:
+            return self.native_set_position
+        mouse_controller = self.mouse_controller
+        
+        def set_position(position):
+            mouse_controller.position = position
+        return set_position
+    
+    def plan_action(self, action):
+        """Translate an action into the (callable, args) steps that replay it"""
+        action_type = action['type']
+        
+        if action_type == 'mouse_move':
+            return [(self._set_position, ((action['x'], action['y']),))]
+        elif action_type == 'mouse_click':
+            mouse_controller = self.mouse_controller
+            click = mouse_controller.press if action['pressed'] else mouse_controller.release
+            return [(self._set_position, ((action['x'], action['y']),)),
+                    (click, (_BUTTON_MAP.get(action['button'], Button.left),))]
+        elif action_type in ('key_press', 'key_release', 'key_stroke'):
+            key = self.map_key(action['key'])
+            if key is None:
+                self._unknown_keys.add(action['key'])
+                return []
+            if action_type == 'key_press':
+                return [(self.keyboard_controller.press, (key,))]
+            elif action_type == 'key_release':
+                return [(self.keyboard_controller.release, (key,))]
+            return [(self.keyboard_controller.press, (key,)),
+                    (self.keyboard_controller.release, (key,))]
+        return []
+    
+    def _prepare(self, actions, coalesce_ms=0):
+        """Translate all actions into (callable, args) steps
+        
+        Returns parallel lists of step callables, step arguments, recorded
+        timestamps, and whether each step is a plain pointer move. Runs of
+        mouse moves are collapsed to the last position within each
+        coalesce_ms window; any other action ends the current run.
+        """
+        plan_action = self.plan_action
+        bucket = coalesce_ms / 1000.0
+        fns = []
+        arguments = []
+        timestamps = []
+        moves = []
+        pending_move = None
+        anchor = None
+        if any(action['type'] == 'key_stroke' for action in actions):
+            actions = expand_key_strokes(actions)
+        else:
+            # Held-back key presses can still follow later mouse actions in the file
+            actions = sorted(actions, key=itemgetter('timestamp'))
+        
+        def flush_move():
+            fns.append(pending_move[0])
+            arguments.append(pending_move[1])
+            timestamps.append(pending_move[2])
+            moves.append(True)
+        
+        for action in actions:
+            steps = plan_action(action)
+            if not steps:
+                continue
+            timestamp = action['timestamp']
+            is_move = action['type'] == 'mouse_move'
+            
+            if is_move and bucket > 0:
+                if pending_move is not None and timestamp - anchor > bucket:
+                    flush_move()
+                    pending_move = None
+                if pending_move is None:
+                    anchor = timestamp
+                pending_move = steps[0] + (timestamp,)
+                continue
+            
+            if pending_move is not None:
+                flush_move()
+                pending_move = None
+            for fn, args in steps:
+                fns.append(fn)
+                arguments.append(args)
+                timestamps.append(timestamp)
+                moves.append(is_move)
+        
+        if pending_move is not None:
+            flush_move()
+        if self._unknown_keys:
+            print(f"Skipping keys that cannot be replayed: {', '.join(sorted(self._unknown_keys))}")
+            self._unknown_keys.clear()
+        return fns, arguments, timestamps, moves
     
     def replay_action(self, action):
         """Execute a single action"""
-        action_type = action.get('type')
-        
         try:
-            if action_type == 'mouse_move':
-                x, y = action['x'], action['y']
-                self.mouse_controller.position = (x, y)
-                
-            elif action_type == 'mouse_click':
-                x, y = action['x'], action['y']
-                button = self.map_mouse_button(action['button'])
-                pressed = action['pressed']
-                
-                self.mouse_controller.position = (x, y)
-                if pressed:
-                    self.mouse_controller.press(button)
-                else:
-                    self.mouse_controller.release(button)
-                    
-            elif action_type == 'key_press':
-                key = self.map_key(action['key'])
-                self.keyboard_controller.press(key)
-                
-            elif action_type == 'key_release':
-                key = self.map_key(action['key'])
-                self.keyboard_controller.release(key)
-                
+            for fn, args in self.plan_action(action):
+                fn(*args)
         except Exception as e:
-            print(f"Error executing action {action_type}: {e}")
+            print(f"Error executing action {action.get('type')}: {e}")
     
-    def replay_recording(self, recording_data, speed_multiplier=1.0, repeat_times=1):
+    def replay_recording(self, recording_data, speed_multiplier=1.0, repeat_times=1, coalesce_ms=8,
+                         boost_priority=False):
         """Replay the entire recording with specified speed and repetitions"""
         if not recording_data or 'actions' not in recording_data:
             print("Invalid recording data")
@@ -115,57 +353,104 @@ class ActionReplayer:
         print(f"Speed: {speed_multiplier}x, Repetitions: {repeat_times}")
         print("Press Ctrl+C to stop replay")
         
+        # Bind every action to the controller call that replays it, and compute
+        # the scheduled offset of each step from the start of a repetition
+        fns, arguments, timestamps, moves = self._prepare(actions, coalesce_ms)
+        if not fns:
+            print("No actions to replay")
+            return
+        first_timestamp = timestamps[0]
+        offsets = [(ts - first_timestamp) / speed_multiplier for ts in timestamps]
+        total = len(fns)
+        
+        # No progress output where stderr is missing (pythonw) or text-only
+        progress_out = getattr(sys.stderr, 'buffer', None)
+        
         self.is_replaying = True
+        self._stop.clear()
+        stop_requested = self._stop.is_set
+        wait_for_stop = self._stop.wait
+        perf_counter = time.perf_counter
+        
+        # Ask Windows for 1 ms timer resolution for the duration of the replay
+        winmm = None
+        if sys.platform == 'win32':
+            try:
+                import ctypes
+                winmm = ctypes.windll.winmm
+                winmm.timeBeginPeriod(1)
+            except Exception:
+                winmm = None
+        
+        restore_priority = boost_thread_priority() if boost_priority else None
         
         try:
             for repetition in range(repeat_times):
-                if not self.is_replaying:
+                if stop_requested():
                     break
                 
                 if repeat_times > 1:
                     print(f"\n--- Repetition {repetition + 1}/{repeat_times} ---")
                 
-                self.start_time = time.time()
-                first_timestamp = actions[0]['timestamp']
+                # Schedule every action against one absolute start time so
+                # sleep overshoot never accumulates from one action to the next
+                self.start_time = start = last_progress = perf_counter()
+                deadlines = [start + offset for offset in offsets]
+                rep_info = b" (Rep %d/%d)" % (repetition + 1, repeat_times) if repeat_times > 1 else b""
                 
-                for i, action in enumerate(actions):
-                    if not self.is_replaying:
+                for i in range(total):
+                    # Block for the coarse part of the wait, then spin to the
+                    # deadline; stop_replay() cuts the blocking part short
+                    deadline = deadlines[i]
+                    now = perf_counter()
+                    remaining = deadline - now
+                    if remaining > 0.002:
+                        while remaining > SPIN_MARGIN:
+                            if wait_for_stop(min(remaining - SPIN_MARGIN, WAIT_SLICE)):
+                                break
+                            remaining = deadline - perf_counter()
+                        if stop_requested():
+                            break
+                    elif stop_requested():
                         break
-                        
-                    # Calculate delay from previous action
-                    current_timestamp = action['timestamp']
-                    target_time = (current_timestamp - first_timestamp) / speed_multiplier
-                    
-                    # Wait until it's time for this action
-                    elapsed_time = time.time() - self.start_time
-                    sleep_time = target_time - elapsed_time
-                    
-                    if sleep_time > 0:
-                        time.sleep(sleep_time)
+                    elif (remaining < 0 and moves[i] and i + 1 < total and moves[i + 1]
+                          and deadlines[i + 1] <= now):
+                        # Running late: skip pointer positions already
+                        # superseded by the next overdue move
+                        continue
+                    while perf_counter() < deadline:
+                        pass
                     
                     # Execute the action
-                    self.replay_action(action)
+                    fns[i](*arguments[i])
                     
-                    # Print progress
-                    if i % 50 == 0:  # Print every 50 actions
-                        progress = (i / len(actions)) * 100
-                        rep_info = f" (Rep {repetition + 1}/{repeat_times})" if repeat_times > 1 else ""
-                        print(f"Progress: {progress:.1f}% ({i}/{len(actions)}){rep_info}")
+                    # Report progress at most twice a second, keeping stdout
+                    # locking and float formatting out of the timing loop
+                    if progress_out is not None and now - last_progress > 0.5:
+                        progress_out.write(b"Progress: %d%% (%d/%d)%s\n" % (i * 100 // total, i, total, rep_info))
+                        progress_out.flush()
+                        last_progress = now
                 
                 # Small pause between repetitions if there are multiple
-                if repetition < repeat_times - 1 and self.is_replaying:
+                if repetition < repeat_times - 1 and not stop_requested():
                     print("Pausing 1 second before next repetition...")
-                    time.sleep(1.0)
+                    if wait_for_stop(1.0):
+                        break
                     
         except KeyboardInterrupt:
             print("\nReplay interrupted by user")
         except Exception as e:
             print(f"Error during replay: {e}")
         finally:
+            if restore_priority is not None:
+                restore_priority()
+            if winmm is not None:
+                winmm.timeEndPeriod(1)
             self.is_replaying = False
             print("Replay finished")
     
-    def start_replay_thread(self, recording_data, speed_multiplier=1.0, repeat_times=1):
+    def start_replay_thread(self, recording_data, speed_multiplier=1.0, repeat_times=1, coalesce_ms=8,
+                            boost_priority=False):
         """Start replay in a separate thread"""
         if self.is_replaying:
             print("Replay already in progress")
@@ -173,14 +458,14 @@ class ActionReplayer:
             
         self.replay_thread = threading.Thread(
             target=self.replay_recording, 
-            args=(recording_data, speed_multiplier, repeat_times)
+            args=(recording_data, speed_multiplier, repeat_times, coalesce_ms, boost_priority)
         )
         self.replay_thread.daemon = True
         self.replay_thread.start()
     
     def stop_replay(self):
         """Stop the current replay"""
-        self.is_replaying = False
+        self._stop.set()
         if self.replay_thread:
             self.replay_thread.join(timeout=1.0)
     
@@ -189,20 +474,17 @@ class ActionReplayer:
         if not recording_data:
             return
             
-        info = recording_data.get('recording_info', {})
+        info = self.recording_info
         actions = recording_data.get('actions', [])
         
         print("=== Recording Analysis ===")
         print(f"Start time: {info.get('start_time', 'Unknown')}")
         print(f"End time: {info.get('end_time', 'Unknown')}")
         print(f"Duration: {info.get('duration', 'Unknown')} seconds")
-        print(f"Total actions: {len(actions)}")
+        print(f"Total actions: {self.action_count}")
         
         # Count action types
-        action_counts = {}
-        for action in actions:
-            action_type = action.get('type')
-            action_counts[action_type] = action_counts.get(action_type, 0) + 1
+        action_counts = Counter(map(itemgetter('type'), actions))
         
         print("\nAction breakdown:")
         for action_type, count in sorted(action_counts.items()):
@@ -245,6 +527,10 @@ def get_int_input(prompt, default=1, min_val=1, max_val=100):
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("filepath", help="file path to the json file")
+    parser.add_argument("--coalesce-ms", type=float, default=8.0,
+                        help="collapse mouse moves within this many milliseconds into one (0 to disable)")
+    parser.add_argument("--boost-priority", action="store_true",
+                        help="run the replay at real-time priority pinned to one CPU (may need admin/root)")
     args = parser.parse_args()
 
     replayer = ActionReplayer()
@@ -275,7 +561,7 @@ def main():
             for i in range(3, 0, -1):
                 print(f"{i}...")
                 time.sleep(1)
-            replayer.replay_recording(recording_data, 1.0, 1)
+            replayer.replay_recording(recording_data, 1.0, 1, args.coalesce_ms, args.boost_priority)
             
         elif choice == '2':
             print("\n=== Custom Replay Settings ===")
@@ -285,7 +571,7 @@ def main():
             print("\nRepeat examples: 1 (once), 5 (five times), 10 (ten times)")
             repeat = get_int_input("Enter number of repetitions (1 - 100)")
             
-            estimated_time = (recording_data.get('recording_info', {}).get('duration', 100) / speed) * repeat
+            estimated_time = (replayer.recording_info.get('duration', 100) / speed) * repeat
             print(f"\nEstimated total time: {estimated_time:.1f} seconds")
             print(f"Settings: {speed}x speed, {repeat} repetition(s)")
             
@@ -295,7 +581,8 @@ def main():
                 for i in range(3, 0, -1):
                     print(f"{i}...")
                     time.sleep(1)
-                replayer.replay_recording(recording_data, speed, repeat)
+                replayer.replay_recording(recording_data, speed, repeat, args.coalesce_ms,
+                                          args.boost_priority)
             else:
                 print("Replay cancelled")
             
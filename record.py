@@ -3,26 +3,190 @@ import json
 import time
 import threading
 import os
+import queue
+import argparse
+import signal
+import gzip
+import heapq
+import mmap
+import zlib
+from itertools import islice
 from datetime import datetime
 from pathlib import Path
 from pynput import keyboard, mouse
 from pynput.keyboard import Key
 from pynput.mouse import Button
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+if orjson is not None:
+    def _dumps(obj, indent=False):
+        """Serialize obj to compact (or 2-space indented) JSON bytes"""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    _loads = orjson.loads
+else:
+    def _dumps(obj, indent=False):
+        """Serialize obj to compact (or 2-space indented) JSON bytes"""
+        if indent:
+            return json.dumps(obj, indent=2).encode()
+        return json.dumps(obj, separators=(',', ':')).encode()
+    _loads = json.loads
+
+# The writer thread collects serialized actions and writes them out in chunks
+# of about this many bytes
+WRITE_BUFFER_SIZE = 1 << 20
+_O_BINARY = getattr(os, 'O_BINARY', 0)  # no newline translation on Windows
+
+# Mouse moves are dropped while this many actions are waiting for the writer,
+# so a stalled disk cannot grow the queue without bound
+QUEUE_LIMIT = 200000
+
+# Most actions the writer takes off the queue per wakeup
+WRITE_BATCH = 256
+
+# The writer reports progress every this many recorded actions
+PROGRESS_EVERY = 200
+
+# Each recording gets a small sidecar file holding just its recording_info,
+# so listing recordings does not have to parse every action
+META_SUFFIX = '.meta.json'
+
+# Extra actions read past max_actions when previewing a streamed recording.
+# Held-back key presses are written after the mouse moves made while the key
+# was down, and moves are throttled to about 60 a second, so this covers a
+# key held through roughly 15 seconds of continuous movement.
+PREVIEW_LOOKAHEAD = 1000
+# Separates the actions from the recording info at the end of the file
+_INFO_MARKER = b'\n],\n"recording_info": '
+
+# Modifier groups; _MOD_NAMES maps any combination to its names in this order
+CTRL, ALT, SHIFT, CMD = 1, 2, 4, 8
+_MOD_NAMES = [tuple(name for name, bit in (('ctrl', CTRL), ('alt', ALT), ('shift', SHIFT), ('cmd', CMD))
+                    if mask & bit)
+              for mask in range(16)]
+START_MODS = CTRL | SHIFT  # Ctrl+Shift+R starts recording
+STOP_MODS = CTRL | ALT  # Ctrl+Alt+S stops it
+
+# Modifier group of each modifier key. Every key also gets its own bit, so
+# releasing one side of a pair (ctrl_r while ctrl_l is held) keeps the group.
+_MOD_GROUP = {
+    Key.ctrl_l: CTRL, Key.ctrl_r: CTRL, Key.ctrl: CTRL,
+    Key.alt_l: ALT, Key.alt_r: ALT, Key.alt: ALT,
+    Key.shift: SHIFT, Key.shift_l: SHIFT, Key.shift_r: SHIFT,
+    Key.cmd: CMD, Key.cmd_l: CMD, Key.cmd_r: CMD
+}
+_MOD_KEY_BIT = {key: 1 << i for i, key in enumerate(_MOD_GROUP)}
+_GROUP_KEY_MASK = [(group, sum(bit for key, bit in _MOD_KEY_BIT.items() if _MOD_GROUP[key] == group))
+                   for group in (CTRL, ALT, SHIFT, CMD)]
+
+# Handlers queue plain tuples and only the writer thread serializes them, with
+# one encoder per action type that fills in a fixed JSON template:
+#   KEY_PRESS, KEY_RELEASE:  (type, timestamp, key, modifiers)
+#   KEY_STROKE:              (type, timestamp, key, modifiers, duration)
+#   MOUSE_CLICK:             (type, timestamp, x, y, button, pressed, modifiers)
+#   MOUSE_MOVE:              (type, timestamp, x, y)
+#   MOUSE_SCROLL:            (type, timestamp, x, y, dx, dy, modifiers)
+# Times are queued as whole microseconds and written out in seconds, and
+# modifiers are queued as a CTRL/ALT/SHIFT/CMD bitmask.
+_MOD_JSON = [_dumps(list(names)) for names in _MOD_NAMES]
+_NAME_JSON = {}
+
+def _json_name(name):
+    """Return the JSON encoding of a key or button name, cached"""
+    encoded = _NAME_JSON.get(name)
+    if encoded is None:
+        encoded = _NAME_JSON[name] = _dumps(name)
+    return encoded
+
+def _encode_key_press(action):
+    return b'{"type":"key_press","timestamp":%a,"key":%s,"modifiers":%s}' % (
+        action[1] / 1000000, _json_name(action[2]), _MOD_JSON[action[3]])
+
+def _encode_key_release(action):
+    return b'{"type":"key_release","timestamp":%a,"key":%s,"modifiers":%s}' % (
+        action[1] / 1000000, _json_name(action[2]), _MOD_JSON[action[3]])
+
+def _encode_key_stroke(action):
+    return b'{"type":"key_stroke","timestamp":%a,"key":%s,"modifiers":%s,"duration":%a}' % (
+        action[1] / 1000000, _json_name(action[2]), _MOD_JSON[action[3]], action[4] / 1000000)
+
+def _encode_mouse_click(action):
+    return b'{"type":"mouse_click","timestamp":%a,"x":%a,"y":%a,"button":%s,"pressed":%s,"modifiers":%s}' % (
+        action[1] / 1000000, action[2], action[3], _json_name(action[4]),
+        b'true' if action[5] else b'false', _MOD_JSON[action[6]])
+
+def _encode_mouse_move(action):
+    return b'{"type":"mouse_move","timestamp":%a,"x":%a,"y":%a}' % (
+        action[1] / 1000000, action[2], action[3])
+
+def _encode_mouse_scroll(action):
+    return b'{"type":"mouse_scroll","timestamp":%a,"x":%a,"y":%a,"dx":%a,"dy":%a,"modifiers":%s}' % (
+        action[1] / 1000000, action[2], action[3], action[4], action[5], _MOD_JSON[action[6]])
+
+# Queued tuples carry the action type as a small int indexing _ENCODERS
+KEY_PRESS, KEY_RELEASE, KEY_STROKE, MOUSE_CLICK, MOUSE_MOVE, MOUSE_SCROLL = range(6)
+_ENCODERS = [_encode_key_press, _encode_key_release, _encode_key_stroke,
+             _encode_mouse_click, _encode_mouse_move, _encode_mouse_scroll]
+
+_WM_MOUSEMOVE = 0x0200
+
+# A move is recorded only once the pointer has gone more than MOVE_DISTANCE
+# pixels along either axis or MOVE_TIMEOUT microseconds have passed since the
+# last recorded move; on_mouse_move and _win32_mouse_filter share these
+MOVE_DISTANCE = 10
+MOVE_TIMEOUT = 500000
+
+# Moves that stay in the same MOVE_CELL x MOVE_CELL pixel cell are recorded at
+# most once per MIN_MOVE_INTERVAL microseconds
+MOVE_CELL = 16
+MIN_MOVE_INTERVAL = 16000
+
+# Sentinel "last move" coordinate that is always more than MOVE_DISTANCE from a real one
+_NO_MOVE = -10000
+
+# Formatted names of special keys; KeyCodes without a char are added on first use
+_KEY_CACHE = {key: key.name for key in Key}
 
 class ActionRecorder:
-    def __init__(self, output_dir="recordings", output_file=None):
+    def __init__(self, output_dir="recordings", output_file=None, collapse_strokes=True, compress=False):
         self.output_dir = Path(output_dir)
         self.output_file = output_file
-        self.actions = []
+        self.collapse_strokes = collapse_strokes
+        self.compress = compress  # gzip the recording (.json.gz)
+        self._pending_press = None  # (key, key_press tuple) not yet written
         self.start_time = None
+        self._start_ns = 0
+        self._start_iso = None  # start_time formatted for the recording info
+        self._start_stamp = None  # and for auto-generated filenames
         self.recording = False
         self.keyboard_listener = None
         self.mouse_listener = None
-        self.pressed_keys = set()
-        self.stop_requested = False
+        self._mod_keys = 0  # one bit per held modifier key
+        self._mod_bits = 0  # CTRL/ALT/SHIFT/CMD groups currently held
+        self._stop_event = threading.Event()
         self.waiting_for_trigger = False
         self.trigger_listener = None
         
+        # Listener callbacks only queue action tuples; a writer thread does all
+        # serialization and file I/O off the input hook threads
+        self._fd = None
+        self._buf = bytearray()  # serialized output not yet written to _fd
+        self._compressor = None
+        self._queue = queue.SimpleQueue()
+        self._writer = None
+        self._action_count = 0
+        self._dropped_moves = 0  # moves skipped because the queue was full
+        # Position and time of the last recorded move; _NO_MOVE once any other
+        # action has been recorded after it
+        self._last_move_x = self._last_move_y = _NO_MOVE
+        self._last_move_ts = 0
+        
         # Create output directory if it doesn't exist
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
@@ -35,14 +199,29 @@ class ActionRecorder:
         print("You can switch to other applications - monitoring continues in background")
         
         self.recording = False
-        self.stop_requested = False
+        self._stop_event.clear()
         self.start_time = None
-        self.actions = []
-        self.pressed_keys = set()
+        self._action_count = 0
+        self._dropped_moves = 0
+        self._last_move_x = self._last_move_y = _NO_MOVE
+        self._last_move_ts = 0
+        self._pending_press = None
+        self._mod_keys = 0
+        self._mod_bits = 0
         self.recording_started = False
         
+        # Ctrl+C stops the recording like ESC does
+        previous_sigint = None
+        if threading.current_thread() is threading.main_thread():
+            previous_sigint = signal.signal(signal.SIGINT, lambda signum, frame: self._request_stop())
+        
         try:
-            # Create listeners that handle both trigger and recording
+            self._writer = threading.Thread(target=self._write_actions, name="recorder-writer", daemon=True)
+            self._writer.start()
+            
+            # The keyboard listener watches for the trigger and records keys; the
+            # mouse listener is only started once recording begins, so no mouse
+            # events reach Python while waiting
             self.keyboard_listener = keyboard.Listener(
                 on_press=self.on_key_press,
                 on_release=self.on_key_release,
@@ -53,29 +232,41 @@ class ActionRecorder:
                 on_click=self.on_mouse_click,
                 on_move=self.on_mouse_move,
                 on_scroll=self.on_mouse_scroll,
-                suppress=False
+                suppress=False,
+                win32_event_filter=self._win32_mouse_filter
             )
             
             # Start listeners in daemon mode
             self.keyboard_listener.daemon = True
             self.mouse_listener.daemon = True
             self.keyboard_listener.start()
-            self.mouse_listener.start()
             
             print("🎯 Waiting for Ctrl+Shift+R to start recording...")
             
-            # Keep monitoring until stop is requested
-            while not self.stop_requested:
-                time.sleep(0.1)
-                # Check if listeners are still running
-                if not (self.keyboard_listener.running or self.mouse_listener.running):
+            # Block until a stop combination, ESC or Ctrl+C requests a stop. Wake
+            # once a second to notice a keyboard listener that died; this also
+            # lets the Ctrl+C handler run on Windows, where an untimed wait
+            # cannot be interrupted
+            while not self._stop_event.wait(1.0):
+                if not self.keyboard_listener.running:
                     break
                 
         except Exception as e:
             print(f"Error during recording: {e}")
         finally:
+            if previous_sigint is not None:
+                signal.signal(signal.SIGINT, previous_sigint)
             self.stop_recording()
     
+    @property
+    def stop_requested(self):
+        """Whether a stop combination, ESC or Ctrl+C has ended the recording"""
+        return self._stop_event.is_set()
+    
+    def _request_stop(self):
+        """Ask start_recording to stop and save"""
+        self._stop_event.set()
+    
     def stop_recording(self):
         """Stop recording and save to file"""
         if self.recording:
@@ -87,9 +278,29 @@ class ActionRecorder:
             if self.mouse_listener and self.mouse_listener.running:
                 self.mouse_listener.stop()
             
+            self.flush_pending_press()
+            self.stop_writer()
             self.save_actions()
             print(f"\nRecording stopped. Actions saved to {self.get_output_filepath()}")
-            print(f"Total actions recorded: {len(self.actions)}")
+            print(f"Total actions recorded: {self._action_count}")
+            if self._dropped_moves:
+                print(f"⚠️  Skipped {self._dropped_moves} mouse moves while writing fell behind")
+        else:
+            self.stop_writer()
+    
+    def stop_writer(self):
+        """Let the writer thread drain the queue and exit"""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+    
+    def notify(self, message):
+        """Print a message from the writer thread so listener callbacks never wait on stdout"""
+        if self._writer is not None:
+            self._queue.put_nowait(message)
+        else:
+            print(message)
     
     def get_output_filepath(self):
         """Generate output file path"""
@@ -98,94 +309,98 @@ class ActionRecorder:
             filename = self.output_file
         else:
             # Generate filename with timestamp
-            timestamp = datetime.fromtimestamp(self.start_time).strftime("%Y%m%d_%H%M%S")
-            filename = f"recording_{timestamp}.json"
+            filename = f"recording_{self._start_stamp}.json"
+        if self.compress and not filename.endswith('.gz'):
+            filename += '.gz'
         
         return self.output_dir / filename
     
     def get_timestamp(self):
-        """Get timestamp relative to start time"""
-        return time.time() - self.start_time if self.start_time else 0
-        """Get timestamp relative to start time"""
-        return time.time() - self.start_time if self.start_time else 0
+        """Get whole microseconds since the recording started"""
+        return (time.perf_counter_ns() - self._start_ns) // 1000 if self.start_time else 0
     
     def on_key_press(self, key):
         """Handle key press events"""
         try:
-            # Track pressed keys
-            self.pressed_keys.add(key)
+            # Track held modifiers
+            bit = _MOD_KEY_BIT.get(key)
+            if bit:
+                self._set_modifier_keys(self._mod_keys | bit)
+            char = getattr(key, 'char', None)
             
             # Check for start combination: Ctrl+Shift+R
             if not self.recording:
-                ctrl_pressed = any(k in self.pressed_keys for k in [Key.ctrl_l, Key.ctrl_r, Key.ctrl])
-                shift_pressed = any(k in self.pressed_keys for k in [Key.shift_l, Key.shift_r, Key.shift])
-                r_pressed = (hasattr(key, 'char') and key.char and key.char.lower() == 'r')
-                
-                if ctrl_pressed and shift_pressed and r_pressed:
-                    print("🔴 Recording started! Listening for events...")
-                    self.recording = True
+                if (self._mod_bits & START_MODS) == START_MODS and (char == 'r' or char == 'R'):
                     self.start_time = time.time()
-                    self.actions = []
+                    self._start_ns = time.perf_counter_ns()
+                    started = datetime.fromtimestamp(self.start_time)
+                    self._start_iso = started.isoformat()
+                    self._start_stamp = started.strftime("%Y%m%d_%H%M%S")
+                    if not self.open_output():
+                        return
+                    self.notify("🔴 Recording started! Listening for events...")
+                    self.recording = True
                     self.recording_started = True
+                    self.mouse_listener.start()
                     return  # Don't record the trigger combination
             
             # Check for stop combination: Ctrl+Alt+S (only when recording)
             if self.recording:
-                ctrl_pressed = any(k in self.pressed_keys for k in [Key.ctrl_l, Key.ctrl_r, Key.ctrl])
-                alt_pressed = any(k in self.pressed_keys for k in [Key.alt_l, Key.alt_r, Key.alt])
-                s_pressed = (hasattr(key, 'char') and key.char and key.char.lower() == 's')
-                
-                if ctrl_pressed and alt_pressed and s_pressed:
-                    print(f"\nStop combination detected! Stopping recording...")
-                    self.stop_requested = True
+                if (self._mod_bits & STOP_MODS) == STOP_MODS and (char == 's' or char == 'S'):
+                    self.notify("\nStop combination detected! Stopping recording...")
+                    self._request_stop()
                     return False  # Stop the listener
                 
                 # Alternative: ESC key as emergency stop
-                if key == Key.esc:
-                    print(f"\nESC pressed - Stopping recording...")
-                    self.stop_requested = True
+                if key is Key.esc:
+                    self.notify("\nESC pressed - Stopping recording...")
+                    self._request_stop()
                     return False
                 
                 # Record the key press (only when actively recording)
-                action = {
-                    "type": "key_press",
-                    "timestamp": round(self.get_timestamp(), 3),
-                    "key": self.format_key(key),
-                    "modifiers": self.get_active_modifiers()
-                }
-                self.actions.append(action)
-                
-                # Show progress every 50 actions
-                if len(self.actions) % 50 == 0 and len(self.actions) > 0:
-                    print(f"📊 Recorded {len(self.actions)} actions so far...")
+                action = (KEY_PRESS, self.get_timestamp(),
+                          self.format_key(key), self._mod_bits)
+                if self.collapse_strokes:
+                    # Hold the press back; it becomes a key_stroke if its own
+                    # release is the next key event
+                    self.flush_pending_press()
+                    self._pending_press = (key, action)
+                else:
+                    self.record_action(action)
             
             # Handle ESC to cancel when waiting for trigger
-            elif not self.recording and not self.recording_started and key == Key.esc:
-                print("Recording cancelled.")
-                self.stop_requested = True
+            elif not self.recording and not self.recording_started and key is Key.esc:
+                self.notify("Recording cancelled.")
+                self._request_stop()
                 return False
                 
         except Exception as e:
-            print(f"Error in key press handler: {e}")
+            self.notify(f"Error in key press handler: {e}")
     
     def on_key_release(self, key):
         """Handle key release events"""
         try:
-            # Remove from pressed keys
-            self.pressed_keys.discard(key)
+            # Track held modifiers
+            bit = _MOD_KEY_BIT.get(key)
+            if bit:
+                self._set_modifier_keys(self._mod_keys & ~bit)
             
             # Only record if actively recording
             if self.recording:
-                action = {
-                    "type": "key_release",
-                    "timestamp": round(self.get_timestamp(), 3),
-                    "key": self.format_key(key),
-                    "modifiers": self.get_active_modifiers()
-                }
-                self.actions.append(action)
+                timestamp = self.get_timestamp()
+                pending = self._pending_press
+                if pending is not None and pending[0] == key:
+                    self._pending_press = None
+                    _, press_ts, name, modifiers = pending[1]
+                    self.record_action((KEY_STROKE, press_ts, name, modifiers,
+                                        timestamp - press_ts))
+                else:
+                    self.flush_pending_press()
+                    self.record_action((KEY_RELEASE, timestamp,
+                                        self.format_key(key), self._mod_bits))
                 
         except Exception as e:
-            print(f"Error in key release handler: {e}")
+            self.notify(f"Error in key release handler: {e}")
     
     def on_mouse_click(self, x, y, button, pressed):
         """Handle mouse click events"""
@@ -193,19 +408,11 @@ class ActionRecorder:
             return
         
         try:
-            action = {
-                "type": "mouse_click",
-                "timestamp": round(self.get_timestamp(), 3),
-                "x": x,
-                "y": y,
-                "button": button.name,
-                "pressed": pressed,
-                "modifiers": self.get_active_modifiers()
-            }
-            self.actions.append(action)
+            self.record_action((MOUSE_CLICK, self.get_timestamp(), x, y,
+                                button.name, pressed, self._mod_bits))
             
         except Exception as e:
-            print(f"Error in mouse click handler: {e}")
+            self.notify(f"Error in mouse click handler: {e}")
     
     def on_mouse_move(self, x, y):
         """Handle mouse move events"""
@@ -213,23 +420,43 @@ class ActionRecorder:
             return
         
         try:
-            # Only record significant movements to avoid too much data
-            if (len(self.actions) == 0 or 
-                self.actions[-1]["type"] != "mouse_move" or 
-                abs(self.actions[-1]["x"] - x) > 10 or 
-                abs(self.actions[-1]["y"] - y) > 10 or
-                self.get_timestamp() - self.actions[-1]["timestamp"] > 0.5):
+            # Only record significant movements to avoid too much data; this
+            # runs for every pointer sample, so get_timestamp is inlined
+            ts = (time.perf_counter_ns() - self._start_ns) // 1000
+            last_x = self._last_move_x
+            last_y = self._last_move_y
+            if (abs(x - last_x) > MOVE_DISTANCE or
+                abs(y - last_y) > MOVE_DISTANCE or
+                ts - self._last_move_ts > MOVE_TIMEOUT):
                 
-                action = {
-                    "type": "mouse_move",
-                    "timestamp": round(self.get_timestamp(), 3),
-                    "x": x,
-                    "y": y
-                }
-                self.actions.append(action)
+                # Within one MOVE_CELL-sized cell, keep at most one move per
+                # MIN_MOVE_INTERVAL; this thins out jittery drags
+                if (ts - self._last_move_ts < MIN_MOVE_INTERVAL and
+                    x // MOVE_CELL == last_x // MOVE_CELL and
+                    y // MOVE_CELL == last_y // MOVE_CELL):
+                    return
+                if self._queue.qsize() >= QUEUE_LIMIT:
+                    # The writer is falling behind; moves are the cheapest to lose
+                    self._dropped_moves += 1
+                    return
+                self._queue.put_nowait((MOUSE_MOVE, ts, x, y))
+                self._last_move_x = x
+                self._last_move_y = y
+                self._last_move_ts = ts
                 
         except Exception as e:
-            print(f"Error in mouse move handler: {e}")
+            self.notify(f"Error in mouse move handler: {e}")
+    
+    def _win32_mouse_filter(self, msg, data):
+        """Drop moves on_mouse_move would ignore before pynput dispatches them (Windows only)"""
+        if msg == _WM_MOUSEMOVE:
+            if not self.recording:
+                return False
+            if (abs(data.pt.x - self._last_move_x) <= MOVE_DISTANCE and
+                abs(data.pt.y - self._last_move_y) <= MOVE_DISTANCE and
+                (time.perf_counter_ns() - self._start_ns) // 1000 - self._last_move_ts <= MOVE_TIMEOUT):
+                return False
+        return True
     
     def on_mouse_scroll(self, x, y, dx, dy):
         """Handle mouse scroll events"""
@@ -237,89 +464,170 @@ class ActionRecorder:
             return
         
         try:
-            action = {
-                "type": "mouse_scroll",
-                "timestamp": round(self.get_timestamp(), 3),
-                "x": x,
-                "y": y,
-                "dx": dx,
-                "dy": dy,
-                "modifiers": self.get_active_modifiers()
-            }
-            self.actions.append(action)
+            self.record_action((MOUSE_SCROLL, self.get_timestamp(), x, y,
+                                dx, dy, self._mod_bits))
             
         except Exception as e:
-            print(f"Error in mouse scroll handler: {e}")
+            self.notify(f"Error in mouse scroll handler: {e}")
     
     def format_key(self, key):
         """Format key for JSON serialization"""
+        char = getattr(key, 'char', None)
+        if char is not None:
+            return char
         try:
-            if hasattr(key, 'char') and key.char is not None:
-                return key.char
-            else:
-                return str(key).replace('Key.', '')
-        except:
+            name = _KEY_CACHE.get(key)
+        except TypeError:
             return str(key)
+        if name is None:
+            name = _KEY_CACHE[key] = getattr(key, 'name', None) or str(key)
+        return name
+    
+    def _set_modifier_keys(self, mod_keys):
+        """Update the held modifier keys and the modifier groups they add up to"""
+        self._mod_keys = mod_keys
+        self._mod_bits = sum(group for group, keys in _GROUP_KEY_MASK if mod_keys & keys)
     
     def get_active_modifiers(self):
         """Get currently active modifier keys"""
-        modifiers = []
-        modifier_keys = {
-            Key.ctrl_l: 'ctrl', Key.ctrl_r: 'ctrl', Key.ctrl: 'ctrl',
-            Key.alt_l: 'alt', Key.alt_r: 'alt', Key.alt: 'alt',
-            Key.shift: 'shift', Key.shift_l: 'shift', Key.shift_r: 'shift',
-            Key.cmd: 'cmd', Key.cmd_l: 'cmd', Key.cmd_r: 'cmd'
-        }
-        
-        for key, name in modifier_keys.items():
-            if key in self.pressed_keys and name not in modifiers:
-                modifiers.append(name)
-        
-        return modifiers
+        return _MOD_NAMES[self._mod_bits]
+    
+    def open_output(self):
+        """Open the output file and start the actions array"""
+        output_path = self.get_output_filepath()
+        try:
+            self._fd = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | _O_BINARY, 0o644)
+            self._buf = bytearray(b'{"actions": [')
+            # Compress whenever the name says .gz, including custom names given
+            # without --compress; wbits=31 makes zlib write a gzip header, so
+            # gzip.open can read it back
+            if output_path.name.endswith('.gz'):
+                self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+            else:
+                self._compressor = None
+            return True
+        except Exception as e:
+            print(f"Error opening {output_path}: {e}")
+            self._fd = None
+            return False
+    
+    def _flush_buffer(self, final=False):
+        """Write the buffered output to the file, compressing it first if enabled"""
+        buf = self._buf
+        if self._compressor is not None:
+            compressed = self._compressor.compress(buf)
+            if final:
+                compressed += self._compressor.flush()
+            buf[:] = compressed
+        while buf:
+            del buf[:os.write(self._fd, buf)]
+    
+    def flush_pending_press(self):
+        """Record a held-back key press as a plain key_press"""
+        pending = self._pending_press
+        if pending is not None:
+            self._pending_press = None
+            self.record_action(pending[1])
+    
+    def record_action(self, action):
+        """Queue one action tuple for the writer thread"""
+        self._queue.put_nowait(action)
+        self._last_move_x = _NO_MOVE  # the next move is always recorded
+    
+    def _write_actions(self):
+        """Writer thread: serialize queued actions, append them to the output file and report progress"""
+        get = self._queue.get
+        get_nowait = self._queue.get_nowait
+        while True:
+            batch = [get()]
+            # Take whatever else is already queued so a burst is encoded in one pass
+            try:
+                while len(batch) < WRITE_BATCH:
+                    batch.append(get_nowait())
+            except queue.Empty:
+                pass
+            for action in batch:
+                if action is None:
+                    return
+                if action.__class__ is str:
+                    print(action)
+                    continue
+                if self._fd is None:
+                    continue
+                try:
+                    buf = self._buf
+                    buf += b',\n' if self._action_count else b'\n'
+                    buf += _ENCODERS[action[0]](action)
+                    self._action_count += 1
+                    if self._action_count % PROGRESS_EVERY == 0:
+                        print(f"📊 Recorded {self._action_count} actions so far...")
+                    if len(buf) >= WRITE_BUFFER_SIZE:
+                        self._flush_buffer()
+                except Exception as e:
+                    print(f"Error writing action: {e}")
     
     def save_actions(self):
-        """Save recorded actions to JSON file"""
-        end_time = time.time()
+        """Finish the recording file by appending the recording info"""
+        duration = (time.perf_counter_ns() - self._start_ns) / 1e9
         output_path = self.get_output_filepath()
         
-        data = {
-            "recording_info": {
-                "start_time": datetime.fromtimestamp(self.start_time).isoformat(),
-                "end_time": datetime.fromtimestamp(end_time).isoformat(),
-                "duration": round(end_time - self.start_time, 2),
-                "total_actions": len(self.actions),
-                "output_file": str(output_path)
-            },
-            "actions": self.actions
+        info = {
+            "start_time": self._start_iso,
+            "end_time": datetime.fromtimestamp(self.start_time + duration).isoformat(),
+            "duration": round(duration, 2),
+            "total_actions": self._action_count,
+            "output_file": str(output_path)
         }
         
+        if self._fd is None:
+            return
         try:
-            with open(output_path, 'w') as f:
-                json.dump(data, f, indent=2)
+            self._buf += _INFO_MARKER + _dumps(info, indent=True) + b'}\n'
+            self._flush_buffer(final=True)
             print(f"File saved to: {output_path}")
+            with open(_meta_path(output_path), 'wb') as f:
+                f.write(_dumps(info))
         except Exception as e:
             print(f"Error saving file: {e}")
+        finally:
+            os.close(self._fd)
+            self._fd = None
+            self._buf = bytearray()
+            self._compressor = None
     
-    def load_actions(self, file_path=None):
-        """Load actions from JSON file"""
+    def load_actions(self, file_path=None, max_actions=None):
+        """Load actions from JSON file, or just the earliest max_actions of them"""
         if file_path is None:
             # If no specific file, try to find the most recent recording
             try:
-                json_files = list(self.output_dir.glob("*.json"))
-                if not json_files:
+                recordings = self._scan_recordings()
+                if not recordings:
                     print(f"No recording files found in {self.output_dir}")
                     return None
                 # Get most recent file
-                file_path = max(json_files, key=os.path.getctime)
+                file_path = recordings[0]
                 print(f"Loading most recent recording: {file_path}")
             except Exception as e:
                 print(f"Error finding recordings: {e}")
                 return None
         
         try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-                return data
+            if max_actions is not None and ijson is not None:
+                # Stream only the actions that are needed instead of parsing them
+                # all, reading a little further since file order is not strictly
+                # timestamp order
+                info = read_recording_info(file_path)
+                with _open_recording(file_path) as f:
+                    items = islice(ijson.items(f, 'actions.item', use_float=True), max_actions + PREVIEW_LOOKAHEAD)
+                    actions = heapq.nsmallest(max_actions, items, key=lambda action: action['timestamp'])
+                return {'recording_info': info, 'actions': actions}
+            with _open_recording(file_path) as f:
+                if orjson is not None and not isinstance(f, gzip.GzipFile) and os.fstat(f.fileno()).st_size:
+                    # Parse the mapped file in place (mmap refuses empty files, hence
+                    # the size check); the view is released before the map closes
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+                        return orjson.loads(view)
+                return _loads(f.read())
         except FileNotFoundError:
             print(f"File {file_path} not found")
             return None
@@ -330,26 +638,35 @@ class ActionRecorder:
             print(f"Error loading file: {e}")
             return None
     
+    def _scan_recordings(self):
+        """Return the recording files in the output directory, newest first"""
+        try:
+            with os.scandir(self.output_dir) as entries:
+                found = [(entry.stat().st_ctime, entry.path) for entry in entries
+                         if entry.name.endswith(('.json', '.json.gz')) and not entry.name.endswith(META_SUFFIX)]
+        except FileNotFoundError:
+            return []
+        found.sort(reverse=True)
+        return [Path(path) for _, path in found]
+    
     def list_recordings(self):
         """List all recordings in the output directory"""
         try:
-            json_files = list(self.output_dir.glob("*.json"))
+            json_files = self._scan_recordings()
             if not json_files:
                 print(f"No recordings found in {self.output_dir}")
                 return []
             
             recordings = []
-            for file_path in sorted(json_files, key=os.path.getctime, reverse=True):
+            for file_path in json_files:
                 try:
-                    with open(file_path, 'r') as f:
-                        data = json.load(f)
-                        info = data.get('recording_info', {})
-                        recordings.append({
-                            'file': file_path,
-                            'start_time': info.get('start_time', 'Unknown'),
-                            'duration': info.get('duration', 0),
-                            'actions': info.get('total_actions', 0)
-                        })
+                    info = read_recording_info(file_path)
+                    recordings.append({
+                        'file': file_path,
+                        'start_time': info.get('start_time', 'Unknown'),
+                        'duration': info.get('duration', 0),
+                        'actions': info.get('total_actions', 0)
+                    })
                 except Exception as e:
                     print(f"Error reading {file_path}: {e}")
             
@@ -358,6 +675,51 @@ class ActionRecorder:
             print(f"Error listing recordings: {e}")
             return []
 
+def _meta_path(file_path):
+    """Return the path of a recording's metadata sidecar"""
+    if file_path.suffix == '.gz':
+        file_path = file_path.with_suffix('')
+    return file_path.with_suffix(META_SUFFIX)
+
+def _open_recording(file_path):
+    """Open a recording for reading as bytes, decompressing .gz files"""
+    if str(file_path).endswith('.gz'):
+        return gzip.open(file_path, 'rb')
+    return open(file_path, 'rb')
+
+def read_recording_info(file_path):
+    """Read a recording's info without parsing its actions where possible"""
+    file_path = Path(file_path)
+    try:
+        with open(_meta_path(file_path), 'rb') as f:
+            return _loads(f.read())
+    except FileNotFoundError:
+        pass
+    if file_path.suffix == '.gz':
+        with gzip.open(file_path, 'rb') as f:
+            return _loads(f.read()).get('recording_info', {})
+    with open(file_path, 'rb') as f:
+        # Files written by the recorder end with the recording info
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 4096))
+        tail = f.read()
+        marker = tail.rfind(_INFO_MARKER)
+        if marker >= 0:
+            return _loads(tail[marker + len(_INFO_MARKER):].rstrip()[:-1])
+        f.seek(0)
+        return _loads(f.read()).get('recording_info', {})
+
+def _probe_listener(listener, timeout=1.0):
+    """Start a listener, wait until it is ready (at most timeout seconds) and stop it"""
+    listener.start()
+    # Listener.wait() never returns if the listener thread dies before it is
+    # ready, so wait from a helper thread
+    waiter = threading.Thread(target=listener.wait, daemon=True)
+    waiter.start()
+    waiter.join(timeout)
+    listener.stop()
+    listener.join()  # re-raises anything the listener thread raised
+
 def check_permissions():
     """Check if the program has necessary permissions"""
     print("Checking permissions...")
@@ -366,16 +728,10 @@ def check_permissions():
         def dummy_handler(*args):
             pass
         
-        test_listener = keyboard.Listener(on_press=dummy_handler, on_release=dummy_handler)
-        test_listener.start()
-        time.sleep(0.1)
-        test_listener.stop()
+        _probe_listener(keyboard.Listener(on_press=dummy_handler, on_release=dummy_handler))
         print("✓ Keyboard permissions OK")
         
-        test_listener = mouse.Listener(on_click=dummy_handler, on_move=dummy_handler)
-        test_listener.start()
-        time.sleep(0.1)
-        test_listener.stop()
+        _probe_listener(mouse.Listener(on_click=dummy_handler, on_move=dummy_handler))
         print("✓ Mouse permissions OK")
         
         return True
@@ -389,6 +745,13 @@ def check_permissions():
         return False
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--raw", action="store_true",
+                        help="record every key press and release instead of collapsing them into key strokes")
+    parser.add_argument("--compress", action="store_true",
+                        help="save recordings gzip-compressed (.json.gz)")
+    args = parser.parse_args()
+    
     print("Keyboard and Mouse Action Recorder v2.0")
     print("=====================================")
     
@@ -400,10 +763,10 @@ def main():
     custom_dir = input("Enter custom directory path (or press Enter for default): ").strip()
     
     if custom_dir:
-        recorder = ActionRecorder(output_dir=custom_dir)
+        recorder = ActionRecorder(output_dir=custom_dir, collapse_strokes=not args.raw, compress=args.compress)
         print(f"Using directory: {custom_dir}")
     else:
-        recorder = ActionRecorder()
+        recorder = ActionRecorder(collapse_strokes=not args.raw, compress=args.compress)
         print(f"Using directory: ./recordings")
     
     while True:
@@ -418,7 +781,7 @@ def main():
         if choice == '1':
             # Ask for custom filename (optional)
             custom_name = input("Enter custom filename (or press Enter for auto-generated): ").strip()
-            if custom_name and not custom_name.endswith('.json'):
+            if custom_name and not custom_name.endswith(('.json', '.json.gz')):
                 custom_name += '.json'
             
             if custom_name:
@@ -431,7 +794,7 @@ def main():
             print("="*50)
             
         elif choice == '2':
-            data = recorder.load_actions()
+            data = recorder.load_actions(max_actions=10)
             if data:
                 display_recording_info(data)
                 
@@ -458,7 +821,7 @@ def main():
                     selection = int(input("Enter number: ")) - 1
                     if 0 <= selection < len(recordings):
                         selected_file = recordings[selection]['file']
-                        data = recorder.load_actions(selected_file)
+                        data = recorder.load_actions(selected_file, max_actions=10)
                         if data:
                             display_recording_info(data)
                     else:
@@ -483,11 +846,16 @@ def display_recording_info(data):
     
     if data['actions']:
         print(f"\n📝 First 10 actions:")
-        for i, action in enumerate(data['actions'][:10]):
+        # key_strokes are written when the key is released, so file order is
+        # not strictly timestamp order
+        first = heapq.nsmallest(10, data['actions'], key=lambda action: action['timestamp'])
+        for i, action in enumerate(first):
             ts = action['timestamp']
             action_type = action['type']
             if action_type == 'key_press' or action_type == 'key_release':
                 detail = f"key='{action['key']}'"
+            elif action_type == 'key_stroke':
+                detail = f"key='{action['key']}', held={action['duration']:.3f}s"
             elif action_type == 'mouse_click':
                 detail = f"button={action['button']}, pos=({action['x']},{action['y']}), pressed={action['pressed']}"
             elif action_type == 'mouse_move':